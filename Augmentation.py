@@ -1,9 +1,13 @@
 import numpy as np
 import cv2
-import matplotlib.pyplot as plt
 from pathlib import Path
 import os
+import shutil
+import queue
+import multiprocessing as mp
 import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
 from tqdm import tqdm
 import sys
 import warnings
@@ -18,6 +22,34 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 warnings.filterwarnings("ignore")
 
+BATCH_SIZE = 32
+JPEG_QUALITY = 90
+READER_THREADS = 4
+WRITER_THREADS = 2
+QUEUE_SIZE = 64
+QUEUE_TIMEOUT = 1
+IMAGE_SIZE = 256
+
+# The augmentations applied in directory mode, in order, until each
+# class holds as many images as the largest one.
+AUGMENTATIONS = (
+    'flip', 'rotate', 'blur', 'crop', 'distortion', 'shear', 'skew',
+    'contrast'
+)
+
+# The warping augmentations keep the [50:150, 50:150] center of the
+# warped image, resized to IMAGE_SIZE. Composing this matrix with the
+# warp does the crop and the resize in the same pass.
+CROP_OFFSET, CROP_SIZE = 50, 100
+CROP_MATRIX = np.float32(
+    [[IMAGE_SIZE / CROP_SIZE, 0, -CROP_OFFSET * IMAGE_SIZE / CROP_SIZE],
+     [0, IMAGE_SIZE / CROP_SIZE, -CROP_OFFSET * IMAGE_SIZE / CROP_SIZE],
+     [0, 0, 1]])
+
+# Saturated 2 * x - 50 for every uint8 value, used by the contrast
+# augmentation.
+CONTRAST_LUT = np.clip(np.arange(256) * 2 - 50, 0, 255).astype(np.uint8)
+
 
 class Augmentation:
     '''
@@ -34,52 +66,117 @@ class Augmentation:
     9. Contrast
     '''
 
-    def __init__(self):
-        pass
+    def __init__(self, free_buffers: queue.Queue = None):
+        '''
+        Args:
+            free_buffers (queue.Queue, optional): The IMAGE_SIZE images
+                                    that the warps and resizes may write
+                                    into. A buffer is only put back on it
+                                    once nothing uses its image any more.
+                                    Defaults to None, which allocates a
+                                    new image every time.
+        '''
+        self._free_buffers = free_buffers
+
+    def output_buffer(self, img: np.ndarray) -> np.ndarray:
+        '''
+        Take a free IMAGE_SIZE output buffer for an image, or allocate
+        one if none is free.
+
+        Args:
+            img (np.ndarray): The image to be augmented.
+
+        Returns:
+            buffer (np.ndarray): The buffer, or None if buffers are not
+                                    reused.
+        '''
+        if self._free_buffers is None:
+            return None
+        shape = (IMAGE_SIZE, IMAGE_SIZE) + img.shape[2:]
+        try:
+            buffer = self._free_buffers.get_nowait()
+        except queue.Empty:
+            buffer = None
+        if buffer is None or buffer.shape != shape \
+                or buffer.dtype != img.dtype:
+            buffer = np.empty(shape, img.dtype)
+        return buffer
+
+    def sample_parameters(
+        self, rng: np.random.Generator, imgs: list
+    ) -> dict:
+        '''
+        Draw the random parameters of every augmentation for a batch of
+        images, with one vectorized call per augmentation.
+
+        Args:
+            rng (np.random.Generator): The random generator.
+            imgs (list): The images to be augmented.
 
-    def translation(self, img: np.ndarray) -> np.ndarray:
+        Returns:
+            plan (dict): For each augmentation, a tuple of arrays holding
+                            its arguments, one row per image.
+        '''
+        n = len(imgs)
+        crop_ranges = np.array(
+            [[img.shape[1] - 100, img.shape[0] - 100] for img in imgs])
+        crop_origins = rng.integers(0, crop_ranges, size=(n, 2))
+        return {
+            'translation': tuple(rng.integers(-100, 100, size=(2, n))),
+            'shear': (rng.uniform(0.1, 0.2, size=n),),
+            'rotate': (rng.integers(-180, 180, size=n),),
+            'crop': (crop_origins[:, 0], crop_origins[:, 1]),
+            'skew': (rng.integers(0, 30, size=(n, 3, 2)),),
+            'distortion': (rng.integers(0, 30, size=(n, 4, 2)),),
+        }
+
+    def translation(self, img: np.ndarray, tx: int, ty: int) -> np.ndarray:
         '''
-        Translate the image by a random number of pixels
+        Translate the image by a number of pixels
         in the x and y direction.
 
         Args:
             img (np.ndarray): The image to be translated.
+            tx (int): The translation along the x axis, in pixels.
+            ty (int): The translation along the y axis, in pixels.
 
         Returns:
-            translated_img (np.ndarray): The translated image.
+            translated_img (np.ndarray): The center of the translated image,
+                                    resized to IMAGE_SIZE.
         '''
-        rows, cols, dim = img.shape
-        M = np.float32([[1, 0, np.random.randint(-100, 100)],
-                        [0, 1, np.random.randint(-100, 100)],
+        M = np.float32([[1, 0, tx],
+                        [0, 1, ty],
                         [0, 0, 1]])
-        translated_img = cv2.warpPerspective(img, M, (cols, rows))
-        translated_img = translated_img[50:150, 50:150]
+        translated_img = cv2.warpAffine(
+            img, (CROP_MATRIX @ M)[:2], (IMAGE_SIZE, IMAGE_SIZE),
+            dst=self.output_buffer(img))
         return translated_img
 
-    def shear(self, img, axis=0) -> np.ndarray:
+    def shear(self, img, factor: float, axis=0) -> np.ndarray:
         '''
-        Shear the image by a random number of pixels
-        in the x and y direction.
+        Shear the image along the x or y direction.
 
         Args:
             img (np.ndarray): The image to be sheared.
+            factor (float): The shear factor.
             axis (int, optional): The axis along which the image
                                     is to be sheared. Defaults to 0.
 
         Returns:
-            sheared_img (np.ndarray): The sheared image.
+            sheared_img (np.ndarray): The center of the sheared image,
+                                    resized to IMAGE_SIZE.
         '''
-        rows, cols, dim = img.shape
         if axis == 0:
-            M = np.float32([[1, np.random.uniform(0.1, 0.2), 0],
+            M = np.float32([[1, factor, 0],
                             [0, 1, 0],
                             [0, 0, 1]])
         else:
             M = np.float32([[1, 0, 0],
-                            [np.random.uniform(0.1, 0.2), 1, 0],
+                            [factor, 1, 0],
                             [0, 0, 1]])
-        sheared_img = cv2.warpPerspective(img, M, (cols, rows))
-        sheared_img = sheared_img[50:150, 50:150]
+        sheared_img = cv2.warpAffine(
+            img, (CROP_MATRIX @ M)[:2], (IMAGE_SIZE, IMAGE_SIZE),
+            dst=self.output_buffer(img))
         return sheared_img
 
     def flip(self, img: np.ndarray, axis: int = 0) -> np.ndarray:
@@ -97,92 +194,103 @@ class Augmentation:
         rows, cols, dim = img.shape
         if axis == 0:
             M = np.float32([[-1, 0, cols],
-                            [0, 1, 0],
-                            [0, 0, 1]])
+                            [0, 1, 0]])
         else:
             M = np.float32([[1, 0, 0],
-                            [0, -1, rows],
-                            [0, 0, 1]])
-        reflected_img = cv2.warpPerspective(img, M, (cols, rows))
+                            [0, -1, rows]])
+        reflected_img = cv2.warpAffine(img, M, (cols, rows))
         return reflected_img
 
-    def rotate(self, img: np.ndarray) -> np.ndarray:
+    def rotate(self, img: np.ndarray, angle: float) -> np.ndarray:
         '''
-        Rotate the image by a random angle.
+        Rotate the image around its center.
 
         Args:
             img (np.ndarray): The image to be rotated.
+            angle (float): The rotation angle, in degrees.
 
         Returns:
-            rotated_img (np.ndarray): The rotated image.
+            rotated_img (np.ndarray): The center of the rotated image,
+                                    resized to IMAGE_SIZE.
         '''
         rows, cols, dim = img.shape
         M = cv2.getRotationMatrix2D(
-            (cols/2, rows/2), np.random.randint(-180, 180), 1)
-        rotated_img = cv2.warpAffine(img, M, (cols, rows))
-        rotated_img = rotated_img[50:150, 50:150]
+            (cols/2, rows/2), angle, 1)
+        rotated_img = cv2.warpAffine(
+            img, (CROP_MATRIX @ np.vstack([M, [0, 0, 1]]))[:2],
+            (IMAGE_SIZE, IMAGE_SIZE),
+            dst=self.output_buffer(img))
         return rotated_img
 
-    def crop(self, img: np.ndarray) -> np.ndarray:
+    def crop(self, img: np.ndarray, x: int, y: int) -> np.ndarray:
         '''
-        Crop the image by a random number of pixels in the x and y direction.
+        Crop a 100x100 region of the image.
 
         Args:
             img (np.ndarray): The image to be cropped.
+            x (int): The left edge of the region.
+            y (int): The top edge of the region.
 
         Returns:
             cropped_img (np.ndarray): The cropped image.
         '''
-        rows, cols, dim = img.shape
-        x = np.random.randint(0, cols-100)
-        y = np.random.randint(0, rows-100)
         cropped_img = img[y:y+100, x:x+100]
         return cropped_img
 
-    def skew(self, img: np.ndarray) -> np.ndarray:
+    def skew(self, img: np.ndarray, offsets: np.ndarray) -> np.ndarray:
         '''
-        Skew the image by a random number of pixels in the x and y direction.
+        Skew the image by moving three of its corners inwards.
 
         Args:
             img (np.ndarray): The image to be skewed.
+            offsets (np.ndarray): The (x, y) inward offsets of the
+                                    top-left, top-right and bottom-left
+                                    corners, in pixels.
 
         Returns:
-            skewed_img (np.ndarray): The skewed image.
+            skewed_img (np.ndarray): The center of the skewed image,
+                                    resized to IMAGE_SIZE.
         '''
         rows, cols, dim = img.shape
         pts1 = np.float32([[0, 0], [cols-1, 0], [0, rows-1]])
         pts2 = np.float32(
-            [[np.random.randint(0, 30), np.random.randint(0, 30)],
-             [cols-np.random.randint(0, 30), np.random.randint(0, 30)],
-             [np.random.randint(0, 30), rows-np.random.randint(0, 30)]]
+            [[offsets[0, 0], offsets[0, 1]],
+             [cols-offsets[1, 0], offsets[1, 1]],
+             [offsets[2, 0], rows-offsets[2, 1]]]
         )
         M = cv2.getAffineTransform(pts1, pts2)
-        skewed_img = cv2.warpAffine(img, M, (cols, rows))
-        skewed_img = skewed_img[50:150, 50:150]
+        skewed_img = cv2.warpAffine(
+            img, (CROP_MATRIX @ np.vstack([M, [0, 0, 1]]))[:2],
+            (IMAGE_SIZE, IMAGE_SIZE),
+            dst=self.output_buffer(img))
         return skewed_img
 
-    def distortion(self, img: np.ndarray) -> np.ndarray:
+    def distortion(self, img: np.ndarray, offsets: np.ndarray) -> np.ndarray:
         '''
-        Distort the image by a random number of pixels
-        in the x and y direction.
+        Distort the image by moving its four corners inwards.
 
         Args:
             img (np.ndarray): The image to be distorted.
+            offsets (np.ndarray): The (x, y) inward offsets of the
+                                    top-left, top-right, bottom-left and
+                                    bottom-right corners, in pixels.
 
         Returns:
-            distorted_img (np.ndarray): The distorted image.
+            distorted_img (np.ndarray): The center of the distorted image,
+                                    resized to IMAGE_SIZE.
         '''
         rows, cols, dim = img.shape
         pts1 = np.float32([[0, 0], [cols-1, 0], [0, rows-1], [cols-1, rows-1]])
         pts2 = np.float32(
-            [[np.random.randint(0, 30), np.random.randint(0, 30)],
-             [cols-np.random.randint(0, 30), np.random.randint(0, 30)],
-             [np.random.randint(0, 30), rows-np.random.randint(0, 30)],
-             [cols-np.random.randint(0, 30), rows-np.random.randint(0, 30)]]
+            [[offsets[0, 0], offsets[0, 1]],
+             [cols-offsets[1, 0], offsets[1, 1]],
+             [offsets[2, 0], rows-offsets[2, 1]],
+             [cols-offsets[3, 0], rows-offsets[3, 1]]]
         )
         M = cv2.getPerspectiveTransform(pts1, pts2)
-        distorted_img = cv2.warpPerspective(img, M, (cols, rows))
-        distorted_img = distorted_img[50:150, 50:150]
+        distorted_img = cv2.warpPerspective(
+            img, CROP_MATRIX @ M, (IMAGE_SIZE, IMAGE_SIZE),
+            dst=self.output_buffer(img))
         return distorted_img
 
     def blur(self, img: np.ndarray) -> np.ndarray:
@@ -195,7 +303,9 @@ class Augmentation:
         Returns:
             blurred_img (np.ndarray): The blurred image.
         '''
-        blurred_img = cv2.blur(img, (5, 5), 0)
+        blurred_img = cv2.boxFilter(
+            img, -1, (5, 5), normalize=True,
+            borderType=cv2.BORDER_REPLICATE)
         return blurred_img
 
     def contrast(self, img: np.ndarray) -> np.ndarray:
@@ -208,30 +318,264 @@ class Augmentation:
         Returns:
             contrast_img (np.ndarray): The image with changed contrast.
         '''
-        contrast_img = cv2.addWeighted(
-            img, 2, np.zeros(img.shape, img.dtype), 0, -50)
+        contrast_img = cv2.LUT(img, CONTRAST_LUT)
         return contrast_img
 
 
+counters = {}
+
+
+def init_worker(shared_counters: dict) -> None:
+    '''
+    Share the per-class image counters with a worker process, and keep
+    OpenCV single-threaded in it: the workers already use every core,
+    and splitting each small warp across threads only adds overhead.
+
+    Args:
+        shared_counters (dict): The multiprocessing.Value image count
+                                    of each class, by class name.
+    '''
+    global counters
+    counters = shared_counters
+    cv2.setNumThreads(1)
+
+
+def reserve_slot(save_path: Path, len_largest_directory: int) -> bool:
+    '''
+    Atomically claim room for one more image in save_path, unless it
+    already holds len_largest_directory images.
+
+    Args:
+        save_path (Path): The directory where the image is to be saved.
+        len_largest_directory (int): The number of images to reach.
+
+    Returns:
+        reserved (bool): Whether the image is to be saved.
+    '''
+    counter = counters[save_path.name]
+    with counter.get_lock():
+        if counter.value >= len_largest_directory:
+            return False
+        counter.value += 1
+        return True
+
+
+def image_parameters(plan: dict, j: int) -> dict:
+    '''
+    Get the arguments of every augmentation for one image of a batch.
+
+    Args:
+        plan (dict): The batch parameters, from sample_parameters.
+        j (int): The index of the image in the batch.
+
+    Returns:
+        params (dict): For each augmentation, a tuple of its arguments.
+    '''
+    return {name: tuple(column[j] for column in columns)
+            for name, columns in plan.items()}
+
+
+def batch_is_full(batch: list, len_largest_directory: int) -> bool:
+    '''
+    Check whether every class of a batch already holds
+    len_largest_directory images, in which case it need not be read.
+
+    Args:
+        batch (list): The paths of the images in the batch.
+        len_largest_directory (int): The number of images to reach.
+
+    Returns:
+        full (bool): Whether no image of the batch is to be augmented.
+    '''
+    return all(counters[image.parent.stem].value >= len_largest_directory
+               for image in batch)
+
+
 def augment(
-    image: Path,
+    aug_img: np.ndarray,
+    stem: str,
     save_path: Path,
-    len_largest_directory: int,
-    aug: Augmentation, augmentation_type: str
+    aug: Augmentation, augmentation_type: str,
+    write_queue: queue.Queue,
+    consumers: list
 ) -> None:
     logger.debug(
-        f'Number of images in {image.parent.stem}: \
-            {len(list(save_path.iterdir()))}')
-    logger.debug(
-        f'Number of images in largest directory: {len_largest_directory}')
-    aug_img = getattr(aug, augmentation_type)(cv2.imread(str(image)))
-    aug_img = cv2.resize(aug_img, (256, 256))
-    plt.imsave(
-        Path(
-            save_path,
-            f'{image.stem}_{augmentation_type.title()}.JPG'),
+        f'Number of images in {save_path.name}: \
+            {counters[save_path.name].value}')
+    if aug_img.shape[:2] != (IMAGE_SIZE, IMAGE_SIZE):
+        aug_img = cv2.resize(aug_img, (IMAGE_SIZE, IMAGE_SIZE),
+                             dst=aug.output_buffer(aug_img))
+    put_image(write_queue, (
+        Path(save_path, f'{stem}_{augmentation_type.title()}.JPG'),
         aug_img
-    )
+    ), consumers)
+
+
+def put_image(write_queue: queue.Queue, item: tuple, consumers: list) -> None:
+    '''
+    Put an image on the write queue, unless a writer thread has failed:
+    the queue might then never be drained, so raise its exception
+    instead of blocking forever.
+
+    Args:
+        write_queue (queue.Queue): The queue of images to be saved.
+        item (tuple): The (path, image) pair to be saved.
+        consumers (list): The futures of the writer threads.
+    '''
+    while True:
+        for consumer in consumers:
+            if consumer.done() and consumer.exception() is not None:
+                raise consumer.exception()
+        try:
+            write_queue.put(item, timeout=QUEUE_TIMEOUT)
+            return
+        except queue.Full:
+            continue
+
+
+def stop_writers(write_queue: queue.Queue, consumers: list) -> None:
+    '''
+    Send None to each writer thread, skipping those that have already
+    stopped, so that the queue cannot block this.
+
+    Args:
+        write_queue (queue.Queue): The queue of images to be saved.
+        consumers (list): The futures of the writer threads.
+    '''
+    for _ in consumers:
+        while not all(consumer.done() for consumer in consumers):
+            try:
+                write_queue.put(None, timeout=QUEUE_TIMEOUT)
+                break
+            except queue.Full:
+                continue
+
+
+def write_images(write_queue: queue.Queue, free_buffers: queue.Queue) -> None:
+    '''
+    Encode and save the (path, image) pairs put on the queue,
+    until None is received. Each saved image is then handed back as a
+    free output buffer, unless enough of them are free already.
+
+    Args:
+        write_queue (queue.Queue): The queue of images to be saved.
+        free_buffers (queue.Queue): The free output buffers.
+    '''
+    while True:
+        item = write_queue.get()
+        if item is None:
+            break
+        path, img = item
+        if not cv2.imwrite(
+                str(path), img, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY]):
+            raise OSError(f'Could not write {path}')
+        try:
+            free_buffers.put_nowait(img)
+        except queue.Full:
+            pass
+
+
+def read_batch(readers: ThreadPoolExecutor, batch: list) -> list:
+    '''
+    Start decoding a batch of images in the background.
+
+    Args:
+        readers (ThreadPoolExecutor): The reader threads.
+        batch (list): The paths of the images to be read.
+
+    Returns:
+        futures (list): The futures of the decoded images.
+    '''
+    return [readers.submit(cv2.imread, str(image)) for image in batch]
+
+
+def augment_image(
+    image: Path,
+    img: np.ndarray,
+    save_path: Path,
+    len_largest_directory: int,
+    aug: Augmentation,
+    aug_funcs: tuple,
+    write_queue: queue.Queue,
+    consumers: list,
+    params: dict
+) -> None:
+    '''
+    Apply the augmentations to one image, in order, until its
+    directory holds len_largest_directory images.
+
+    Args:
+        image (Path): The image to be augmented.
+        img (np.ndarray): The decoded image.
+        save_path (Path): The directory where the images are saved.
+        len_largest_directory (int): The number of images to reach.
+        aug (Augmentation): The augmentation instance.
+        aug_funcs (tuple): The (name, bound method) of each augmentation.
+        write_queue (queue.Queue): The queue of images to be saved.
+        consumers (list): The futures of the writer threads.
+        params (dict): The random arguments of each augmentation.
+    '''
+    for augmentation_type, function in aug_funcs:
+        if not reserve_slot(save_path, len_largest_directory):
+            break
+        aug_img = function(img, *params.get(augmentation_type, ()))
+        augment(aug_img, image.stem, save_path,
+                aug, augmentation_type, write_queue, consumers)
+
+
+def augment_directory(images: list, len_largest_directory: int) -> None:
+    '''
+    Augment the images of one class directory, all of them before moving
+    on to another class, until their counterpart in the
+    "augmented_directory" folder holds len_largest_directory images.
+    Image counts are shared between workers, so several directories
+    saving to the same class stop at the same total.
+    Reading, augmenting and saving overlap: reader threads decode the
+    next batch while the current one is augmented, and writer threads
+    encode the results from a bounded queue.
+
+    Args:
+        images (list): The paths of the images in the class directory.
+        len_largest_directory (int): The number of images to reach.
+    '''
+    # Writers hand every saved image back, so a buffer is never written
+    # into while it is still being encoded. Queued images are not used
+    # anywhere else, and no more than this many are in flight at once.
+    free_buffers = queue.Queue(maxsize=QUEUE_SIZE + WRITER_THREADS + 1)
+    aug = Augmentation(free_buffers)
+    rng = np.random.default_rng()
+    aug_funcs = tuple((name, getattr(aug, name)) for name in AUGMENTATIONS)
+    batches = [images[i:i + BATCH_SIZE]
+               for i in range(0, len(images), BATCH_SIZE)]
+    write_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    with ThreadPoolExecutor(max_workers=READER_THREADS) as readers, \
+            ThreadPoolExecutor(max_workers=WRITER_THREADS) as writers:
+        consumers = [writers.submit(write_images, write_queue, free_buffers)
+                     for _ in range(WRITER_THREADS)]
+        pending = []
+        if batches and not batch_is_full(batches[0], len_largest_directory):
+            pending = read_batch(readers, batches[0])
+        try:
+            for i, batch in enumerate(batches):
+                if batch_is_full(batch, len_largest_directory):
+                    break
+                imgs = [future.result() for future in pending]
+                if i + 1 < len(batches) and not batch_is_full(
+                        batches[i + 1], len_largest_directory):
+                    pending = read_batch(readers, batches[i + 1])
+                plan = aug.sample_parameters(rng, imgs)
+                for j, (image, img) in enumerate(zip(batch, imgs)):
+                    save_path = Path(
+                        'data/images/augmented_directory/',
+                        image.parent.stem)
+                    augment_image(image, img, save_path,
+                                  len_largest_directory, aug, aug_funcs,
+                                  write_queue, consumers,
+                                  image_parameters(plan, j))
+        finally:
+            stop_writers(write_queue, consumers)
+        for consumer in consumers:
+            consumer.result()
 
 
 if __name__ == '__main__':
@@ -255,122 +599,79 @@ if __name__ == '__main__':
         sys.exit(1)
 
     if os.path.isdir(args.path):
-        images = Path(args.path).glob('**/*.JPG')
-        for image in tqdm(images, desc=f'Copying images from {args.path} \
-                to augmented_directory', total=len(os.listdir(args.path))):
+        # Walk the tree once, and group the images of each class by the
+        # leaf directory they are saved from, one worker task per class.
+        all_jpgs = list(Path(args.path).rglob('*.JPG'))
+        class_images = {}
+        for image in all_jpgs:
+            if image.parent != Path(args.path):
+                class_images.setdefault(image.parent, []).append(image)
+        for image in tqdm(all_jpgs, desc=f'Copying images from {args.path} \
+                to augmented_directory'):
             save_path = Path(
                 'data/images/augmented_directory/',
                 image.parent.stem)
             os.makedirs(save_path, exist_ok=True)
-            plt.imsave(Path(save_path, image.name), cv2.imread(str(image)))
-
-        largest_directory = max(
-            Path(
-                'data/images/augmented_directory/').iterdir(),
-            key=lambda x: len(list(x.iterdir()))
-        )
-        len_largest_directory = len(list(largest_directory.iterdir()))
+            shutil.copyfile(str(image), str(Path(save_path, image.name)))
+
+        counts = {
+            x.name: sum(1 for _ in x.iterdir())
+            for x in Path('data/images/augmented_directory/').iterdir()
+            if x.is_dir()
+        }
+        largest_directory = max(counts, key=counts.get)
+        len_largest_directory = counts[largest_directory]
         logger.debug(f'Largest directory: {largest_directory}')
         logger.debug(
             f'Number of images in largest directory: {len_largest_directory}')
 
-        for image in tqdm(
-            Path(args.path).iterdir(),
-            desc=f'Augmenting images from {args.path}',
-            total=len(os.listdir(args.path))
-        ):
-            images = image.glob('**/*.JPG')
-            for image in images:
-                aug = Augmentation()
-                img = cv2.imread(str(image))
-                save_path = Path(
-                    'data/images/augmented_directory/',
-                    image.parent.stem)
-                os.makedirs(save_path, exist_ok=True)
-                plt.imsave(Path(save_path, image.name), img)
-
-                # flip images
-                if len(list(save_path.iterdir())) < len_largest_directory:
-                    augment(image, save_path,
-                            len_largest_directory, aug, 'flip')
-                # rotate images
-                if len(list(save_path.iterdir())) < len_largest_directory:
-                    augment(image, save_path,
-                            len_largest_directory, aug, 'rotate')
-                # blur images
-                if len(list(save_path.iterdir())) < len_largest_directory:
-                    augment(image, save_path,
-                            len_largest_directory, aug, 'blur')
-                # crop images
-                if len(list(save_path.iterdir())) < len_largest_directory:
-                    augment(image, save_path,
-                            len_largest_directory, aug, 'crop')
-                # distort images
-                if len(list(save_path.iterdir())) < len_largest_directory:
-                    augment(image, save_path, len_largest_directory,
-                            aug, 'distortion')
-                # shear images
-                if len(list(save_path.iterdir())) < len_largest_directory:
-                    augment(image, save_path,
-                            len_largest_directory, aug, 'shear')
-                # skew images
-                if len(list(save_path.iterdir())) < len_largest_directory:
-                    augment(image, save_path,
-                            len_largest_directory, aug, 'skew')
-                # contrast images
-                if len(list(save_path.iterdir())) < len_largest_directory:
-                    augment(image, save_path,
-                            len_largest_directory, aug, 'contrast')
+        shared_counters = {
+            name: mp.Value('i', count) for name, count in counts.items()}
+        with ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            initializer=init_worker,
+            initargs=(shared_counters,)
+        ) as executor:
+            list(tqdm(
+                executor.map(
+                    augment_directory,
+                    class_images.values(),
+                    repeat(len_largest_directory)
+                ),
+                desc=f'Augmenting images from {args.path}',
+                total=len(class_images)
+            ))
     else:
         aug = Augmentation()
         img = cv2.imread(args.path)
         img_name = Path(args.path).stem
+        rng = np.random.default_rng()
+        params = image_parameters(aug.sample_parameters(rng, [img]), 0)
 
-        translated_img = aug.translation(img)
-        plt.imsave(img_name + '_Translation.JPG', translated_img)
+        translated_img = aug.translation(img, *params['translation'])
+        cv2.imwrite(img_name + '_Translation.JPG', translated_img)
 
-        flipped_img = aug.flip(img, axis=np.random.randint(0, 2))
-        plt.imsave(img_name + '_Flip.JPG', flipped_img)
+        flipped_img = aug.flip(img, axis=rng.integers(0, 2))
+        cv2.imwrite(img_name + '_Flip.JPG', flipped_img)
 
-        rotated_img = aug.rotate(img)
-        plt.imsave(img_name + '_Rotate.JPG', rotated_img)
+        rotated_img = aug.rotate(img, *params['rotate'])
+        cv2.imwrite(img_name + '_Rotate.JPG', rotated_img)
 
         blurred_img = aug.blur(img)
-        plt.imsave(img_name + '_Blur.JPG', blurred_img)
+        cv2.imwrite(img_name + '_Blur.JPG', blurred_img)
 
-        cropped_img = aug.crop(img)
-        plt.imsave(img_name + '_Crop.JPG', cropped_img)
+        cropped_img = aug.crop(img, *params['crop'])
+        cv2.imwrite(img_name + '_Crop.JPG', cropped_img)
 
         contrast_img = aug.contrast(img)
-        plt.imsave(img_name + '_Contrast.JPG', contrast_img)
-
-        plt.figure(figsize=(20, 20))
-        plt.subplot(1, 7, 1)
-        plt.imshow(img)
-        plt.title('Original Image')
-        plt.axis('off')
-        plt.subplot(1, 7, 2)
-        plt.imshow(translated_img)
-        plt.title('Translated Image')
-        plt.axis('off')
-        plt.subplot(1, 7, 3)
-        plt.imshow(flipped_img)
-        plt.title('Flipped Image')
-        plt.axis('off')
-        plt.subplot(1, 7, 4)
-        plt.imshow(rotated_img)
-        plt.title('Rotated Image')
-        plt.axis('off')
-        plt.subplot(1, 7, 5)
-        plt.imshow(blurred_img)
-        plt.title('Blurred Image')
-        plt.axis('off')
-        plt.subplot(1, 7, 6)
-        plt.imshow(cropped_img)
-        plt.title('Cropped Image')
-        plt.axis('off')
-        plt.subplot(1, 7, 7)
-        plt.imshow(contrast_img)
-        plt.title('Contrasted Image')
-        plt.axis('off')
-        plt.show()
+        cv2.imwrite(img_name + '_Contrast.JPG', contrast_img)
+
+        grid = cv2.hconcat([
+            cv2.resize(x, (IMAGE_SIZE, IMAGE_SIZE))
+            for x in (img, translated_img, flipped_img, rotated_img,
+                      blurred_img, cropped_img, contrast_img)
+        ])
+        cv2.imshow('Original, Translation, Flip, Rotate, Blur, Crop, '
+                   'Contrast', grid)
+        cv2.waitKey(0)
+        cv2.destroyAllWindows()
@@ -1,6 +1,21 @@
+import heapq
+import os
 import shutil
 from pathlib import Path
 
+
+def link_or_copy(src, dst):
+    # Hardlink the image, or copy it when the output is on another
+    # filesystem. Like a copy, this replaces any existing dst.
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        os.remove(dst)
+        link_or_copy(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
 input_dir = Path("images")
 output_train_dir = Path("training")
 output_valid_dir = Path("validation")
@@ -16,14 +31,18 @@ for subdir in input_dir.iterdir():
         train_subdir.mkdir(parents=True, exist_ok=True)
         valid_subdir.mkdir(parents=True, exist_ok=True)
 
-        images = sorted(
-            subdir.glob("image (*).JPG"),
+        images = list(subdir.glob("image (*).JPG"))
+        validation_images = heapq.nsmallest(
+            25,
+            images,
             key=lambda x: int(x.stem.split(" ")[1].strip("()")),
         )
-        validation_images = images[:25]
-        training_images = images[25:]
+        validation_set = set(validation_images)
+        training_images = [
+            img for img in images if img not in validation_set
+        ]
 
         for img in training_images:
-            shutil.copy(str(img), str(train_subdir / img.name))
+            link_or_copy(str(img), str(train_subdir / img.name))
         for img in validation_images:
-            shutil.copy(str(img), str(valid_subdir / img.name))
+            link_or_copy(str(img), str(valid_subdir / img.name))